@@ -6,18 +6,222 @@
 from ..munge import ndarray_to_dataframe
 
 import re
+import os
+import ast
+import copy
+import functools
 import numpy as np
 import h5py as h5
 from astropy.table import Table
 import pandas as pd
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import PurePath
 
+# Imported under a private name so that it isn't re-exported by
+# `from .io import *`
+try:
+    from b2h5py import B2Dataset as _B2Dataset
+except ImportError:
+    _B2Dataset = None
+
 
 __meraxes_h = None
 logger = logging.getLogger(__name__)
 logger.setLevel("WARNING")
 
+_SNAP_RE = re.compile(r"^Snap(\d+)$")
+
+# Point selections longer than this are slow for HDF5 to build, so beyond it we
+# read the spanned block of galaxies and pick out the requested ones in memory.
+_MAX_POINT_SELECTION = 1000
+
+# Only bother reading raw chunks directly if they are at least this big,
+# otherwise the per-chunk Python overhead outweighs what we save.
+_MIN_DIRECT_CHUNK_BYTES = 1 << 16
+
+# Reads bigger than this are split into chunk aligned batches of roughly
+# `_READ_BATCH_BYTES` so that HDF5's type conversion buffers stay in cache.
+_MAX_READ_BYTES = 256 << 20
+_READ_BATCH_BYTES = 16 << 20
+
+
+# Options used for every file we open.  The chunk cache is left at HDF5's
+# default as it is allocated per dataset; see `_open_strided` for where it
+# is worth enlarging.
+_FILE_KWARGS = dict(libver="latest")
+
+# Number of chunks the cache should hold for strided reads
+_STRIDED_CACHE_CHUNKS = 4
+
+_H_CONVERSIONS = {}
+_H_CONV_SANITIZE_RE = re.compile(r"(\D\.\S*)|(__.*__)|(__)")
+
+
+def _h_conversion(conversion):
+    """Get a function, ``f(v, h)``, which applies a Hubble conversion string
+    (e.g. ``"v/h**2"``) to the values `v`.
+
+    Conversions which just multiply or divide `v` by a power of `h` are done
+    with a single ufunc call (in place for floating point values).  Anything
+    else falls back to evaluating the compiled expression.  Either way, each
+    conversion string is only parsed once.
+    """
+
+    func = _H_CONVERSIONS.get(conversion)
+    if func is None:
+        func = _H_CONVERSIONS[conversion] = _build_h_conversion(conversion)
+    return func
+
+
+def _build_h_conversion(conversion):
+    tree = ast.parse(conversion.strip(), mode="eval")
+    expr = tree.body
+
+    def is_name(node, name):
+        return isinstance(node, ast.Name) and node.id == name
+
+    def h_power(node):
+        if is_name(node, "h"):
+            return 1
+        if (
+            isinstance(node, ast.BinOp)
+            and isinstance(node.op, ast.Pow)
+            and is_name(node.left, "h")
+            and isinstance(node.right, ast.Constant)
+            and type(node.right.value) in (int, float)
+        ):
+            return node.right.value
+        return None
+
+    if is_name(expr, "v"):
+        return lambda v, h: v
+
+    if isinstance(expr, ast.BinOp) and isinstance(expr.op, (ast.Mult, ast.Div)) and is_name(expr.left, "v"):
+        power = h_power(expr.right)
+        if power is not None:
+            ufunc = np.multiply if isinstance(expr.op, ast.Mult) else np.divide
+
+            def convert(v, h):
+                if v.dtype.kind == "f":
+                    return ufunc(v, h**power, out=v)
+                return ufunc(v, h**power)
+
+            return convert
+
+    code = compile(tree, "<h_conv>", "eval")
+    return lambda v, h: eval(code, dict(v=v, h=h, log10=np.log10, __builtins__={}))
+
+
+def _walk_snapshots(fin):
+    """Iterate over the snapshot groups of an open Meraxes file.
+
+    The top level links are listed in a single pass with the low level API.
+
+    Yields
+    ------
+    snapshot : int
+        Snapshot number
+
+    name : bytes
+        Link name of the snapshot group (e.g. ``b"Snap100"``)
+    """
+
+    names = []
+    fin.id.links.iterate(names.append)
+    for name in names:
+        if not name.startswith(b"Snap"):
+            continue
+        match = _SNAP_RE.match(name.decode())
+        if match is not None:
+            yield int(match.group(1)), name
+
+
+def _snapshot_groups(fin):
+    """Iterate over the snapshot groups of an open Meraxes file that carry a
+    redshift and light travel time.
+
+    Yields
+    ------
+    snapshot : int
+        Snapshot number
+
+    gid : GroupID
+        Low level identifier of the snapshot group
+    """
+
+    # Use the low level API so that we don't construct a Group and
+    # AttributeManager for every snapshot
+    for snap, name in _walk_snapshots(fin):
+        gid = h5.h5g.open(fin.id, name)
+        if h5.h5a.exists(gid, b"Redshift") and h5.h5a.exists(gid, b"LTTime"):
+            yield snap, gid
+
+
+@functools.lru_cache(maxsize=1024)
+def _snap_name(snapshot):
+    # The name of a snapshot's group, e.g. "Snap100"
+    return "Snap%03d" % snapshot
+
+
+def _resolve_snapshot(fin, snapshot):
+    # Turn a negative snapshot into the corresponding present snapshot of an
+    # open Meraxes file (-1 being the last)
+    if snapshot == -1:
+        snapshot = max((snap for snap, _ in _walk_snapshots(fin)), default=None)
+        if snapshot is None:
+            raise IndexError("There are no snapshots in file {:s}!".format(fin.filename))
+    elif snapshot < 0:
+        present_snaps = sorted(snap for snap, _ in _walk_snapshots(fin))
+        try:
+            snapshot = present_snaps[snapshot]
+        except IndexError:
+            raise IndexError(
+                "Snapshot {:d} requested but only {:d} snapshots are present in file {:s}!".format(
+                    snapshot, len(present_snaps), fin.filename
+                )
+            ) from None
+    return snapshot
+
+
+def _read_attr(oid, name, out=None):
+    # Read an attribute using the low level API, bypassing h5py's
+    # AttributeManager.  If given, `out` must match the attribute's shape and
+    # the value is converted straight into it.
+    attr = h5.h5a.open(oid, name)
+    if attr.shape is None:
+        # a null dataspace, which h5py represents as Empty
+        return h5.Empty(attr.dtype)
+    if out is None:
+        out = np.empty(attr.shape, dtype=attr.dtype)
+    attr.read(out)
+    return out
+
+
+def _read_scalar_attr(fin, path, name):
+    # Read the first value of an attribute of the object at `path` in an open
+    # file, without constructing any high level objects on the way
+    path = path.encode()
+    if path not in fin.id:
+        raise KeyError("Unable to open object (object '%s' doesn't exist)" % path.decode())
+    return _read_attr(h5.h5o.open(fin.id, path), name.encode())[0]
+
+
+def _file_key(fname):
+    # Key cached reads on the file's modification time too so that we don't
+    # serve stale values for a file that has since been (re)written.
+    fname = os.path.abspath(fname)
+    return fname, os.path.getmtime(fname)
+
+
+def _open(fname):
+    # Open a file for reading with the options common to all of the io
+    # routines.  Handles are deliberately not kept open between calls, as that
+    # would stop Meraxes (or anything else) from writing to the file.
+    return h5.File(fname, "r", **_FILE_KWARGS)
+
 
 def _check_pandas():
     try:
@@ -59,8 +263,349 @@ def set_little_h(h=None):
     return h
 
 
+def _can_read_direct_chunks(ds, out, allow_unallocated=False):
+    # Can the whole of `ds` be read into `out` raw chunk by raw chunk?  Chunks
+    # that were never written can't be read with read_direct_chunk, so unless
+    # the caller is happy for `_read_direct_chunks` to fill them in
+    # (`allow_unallocated`) every chunk must be allocated.
+    if not (
+        ds.chunks is not None
+        and int(np.prod(ds.chunks)) * out.itemsize >= _MIN_DIRECT_CHUNK_BYTES
+        and out.dtype == ds.dtype
+        and hasattr(ds.id, "read_direct_chunk")
+        and hasattr(ds.id, "get_num_chunks")
+        and ds.id.get_create_plist().get_nfilters() == 0
+    ):
+        return False
+    if allow_unallocated:
+        return hasattr(ds.id, "chunk_iter")
+    return ds.id.get_num_chunks() == _n_chunk_positions(ds)
+
+
+def _n_chunk_positions(ds):
+    # The number of chunks needed to cover the whole of a chunked dataset
+    return int(np.prod([-(-n // c) for n, c in zip(ds.shape, ds.chunks)]))
+
+
+def _read_direct_chunks(ds, out):
+    """Read the whole of the chunked, unfiltered dataset `ds` into `out`, which
+    must have the same shape and dtype, one raw chunk at a time.
+
+    This skips HDF5's selection and type conversion machinery altogether.  If
+    some chunks were never written then `out` is first set to the dataset's
+    fill value and only the stored chunks are read, as HDF5 itself would do.
+    """
+
+    if ds.id.get_num_chunks() == _n_chunk_positions(ds):
+        offsets = (tuple(sel.start for sel in chunk_sel) for chunk_sel in ds.iter_chunks())
+    else:
+        out[...] = ds.fillvalue
+        stored = []
+        ds.id.chunk_iter(stored.append)
+        offsets = (info.chunk_offset for info in stored)
+
+    for offset in offsets:
+        _, raw = ds.id.read_direct_chunk(offset)
+        # Chunks are always stored whole, even where they overhang the edges
+        # of the dataset
+        chunk = np.frombuffer(raw, dtype=ds.dtype).reshape(ds.chunks)
+        sel = tuple(slice(o, min(o + c, n)) for o, c, n in zip(offset, ds.chunks, ds.shape))
+        out[sel] = chunk[tuple(slice(0, s.stop - s.start) for s in sel)]
+
+
+def _read_slab(ds, out, source_sel=np.s_[:], dest_sel=np.s_[:]):
+    """Read a contiguous slab of a per-core dataset into `out`.
+
+    If b2h5py is available and the dataset is Blosc2 compressed then the slab
+    is sliced through b2h5py, which decompresses just the Blosc2 blocks it
+    needs instead of going through the HDF5 filter pipeline.
+
+    Whole, unfiltered, chunked datasets whose layout matches `out` are read
+    chunk by chunk with `read_direct_chunk`, skipping HDF5's selection and type
+    conversion machinery altogether.
+    """
+
+    if source_sel == np.s_[:] and _can_read_direct_chunks(ds, out):
+        _read_direct_chunks(ds, out[dest_sel])
+        return
+
+    if _B2Dataset is not None:
+        b2_ds = _B2Dataset(ds)
+        if b2_ds.is_b2_fast_slicing:
+            slab = b2_ds[source_sel]
+            if out.dtype.names is None:
+                out[dest_sel] = slab
+            else:
+                for name in out.dtype.names:
+                    out[name][dest_sel] = slab[name]
+            return
+
+    # `out` may hold only a subset of the dataset's fields, in which case HDF5
+    # drops the unrequested members during the read itself.
+    if source_sel == np.s_[:] and ds.ndim == 1 and ds.size * out.itemsize > _MAX_READ_BYTES:
+        batch = max(_READ_BATCH_BYTES // out.itemsize, 1)
+        if ds.chunks is not None:
+            batch = max(batch // ds.chunks[0], 1) * ds.chunks[0]
+        offset = dest_sel.start or 0
+        for start in range(0, ds.size, batch):
+            stop = min(start + batch, ds.size)
+            ds.read_direct(out, source_sel=np.s_[start:stop], dest_sel=np.s_[offset + start : offset + stop])
+        return
+
+    ds.read_direct(out, source_sel=source_sel, dest_sel=dest_sel)
+
+
+def _open_strided(group, name, n_chunks=_STRIDED_CACHE_CHUNKS):
+    """Open the dataset `name` in `group` with a chunk cache big enough to
+    hold `n_chunks` of its chunks.
+
+    The cache is allocated per dataset, so it is only worth enlarging for
+    strided reads, where rows from the same chunk are picked out one after
+    another and a chunk too big for the default cache would be decompressed
+    again for each of them.
+    """
+
+    ds = group[name]
+    if ds.chunks is None:
+        return ds
+
+    dapl = h5.h5p.create(h5.h5p.DATASET_ACCESS)
+    nslots, nbytes, w0 = dapl.get_chunk_cache()
+    cache_bytes = n_chunks * int(np.prod(ds.chunks)) * ds.dtype.itemsize
+    if nbytes >= cache_bytes:
+        return ds
+
+    # HDF5 shares the cache of a dataset that is already open, so it has to be
+    # closed before reopening it with the new access properties
+    del ds
+    dapl.set_chunk_cache(nslots, cache_bytes, w0)
+    return h5.Dataset(h5.h5d.open(group.id, name.encode(), dapl=dapl))
+
+
+def _read_rows(ds, out, rows, dest_sel):
+    """Read the (sorted) `rows` of a per-core dataset into `out[dest_sel]`.
+
+    Short selections are handed straight to HDF5 as a point selection.  For
+    longer ones we read contiguous slabs and pick out the rows in memory.  If
+    the dataset is chunked then only runs of chunks which actually contain
+    requested rows are read.
+    """
+
+    if rows.shape[0] <= _MAX_POINT_SELECTION:
+        ds.read_direct(out, source_sel=np.s_[rows.tolist()], dest_sel=dest_sel)
+        return
+
+    # Split the rows wherever there is at least one whole chunk between them
+    chunk_rows = ds.chunks[0] if ds.chunks is not None else ds.shape[0]
+    breaks = np.flatnonzero(np.diff(rows // chunk_rows) > 1) + 1
+    run_starts = np.concatenate(([0], breaks))
+    run_stops = np.concatenate((breaks, [rows.shape[0]]))
+
+    dest = out[dest_sel]
+    for start, stop in zip(run_starts, run_stops):
+        first, last = rows[start], rows[stop - 1]
+        slab = np.empty(last - first + 1, dtype=out.dtype)
+        _read_slab(ds, slab, source_sel=np.s_[first : last + 1])
+        np.take(slab, rows[start:stop] - first, out=dest[start:stop])
+
+
+def _read_cores_worker(fname, ds_names, offsets, shm_name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        with _open(fname) as fin:
+            for ds_name, offset in zip(ds_names, offsets):
+                ds = fin[ds_name]
+                _read_slab(ds, out, dest_sel=np.s_[offset : offset + ds.size])
+        del out
+    finally:
+        shm.close()
+
+
+class _SharedMemoryOwner:
+    # Exposes a shared memory block through the array interface so that arrays
+    # built on it keep the block alive, and it is only closed once the last of
+    # them has gone.
+    def __init__(self, shm, nbytes):
+        self._shm = shm
+        address = np.frombuffer(shm.buf, dtype=np.uint8).ctypes.data
+        self.__array_interface__ = dict(shape=(nbytes,), typestr="|u1", data=(address, False), version=3)
+
+
+def _pool_read_cores(fname, ds_names, sizes, shape, dtype, n_procs):
+    """Read the per-core datasets `ds_names`, of lengths `sizes`, into
+    consecutive slices of a new array of the given `shape` and `dtype` using a
+    pool of `n_procs` processes.
+
+    The array is allocated in shared memory, and each worker opens its own file
+    handle and reads straight into it, so the decompression and I/O of
+    different cores overlap without any copying afterwards.  Any elements not
+    covered by `sizes` are zero.
+    """
+
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        out = np.asarray(_SharedMemoryOwner(shm, nbytes)).view(dtype).reshape(shape)
+
+        if np.count_nonzero(sizes) > 0:
+            offsets = np.concatenate(([0], np.cumsum(sizes)))[:-1]
+            tasks = np.array_split(np.flatnonzero(sizes), min(n_procs, np.count_nonzero(sizes)))
+
+            # HDF5 isn't fork safe, so the workers have to be spawned
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as pool:
+                futures = [
+                    pool.submit(
+                        _read_cores_worker,
+                        fname,
+                        [ds_names[i] for i in task],
+                        offsets[task].tolist(),
+                        shm.name,
+                        shape,
+                        dtype,
+                    )
+                    for task in tasks
+                ]
+                for future in futures:
+                    future.result()
+    finally:
+        # The mapping stays valid after unlinking, this just removes the name
+        shm.unlink()
+
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _offset_indices_kernel():
+    # A numba kernel for `_offset_indices`, or None if numba isn't available.
+    # numba is slow to import, so this is only done the first time it's needed.
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, cache=True)
+    def kernel(ind, offset):
+        for i in prange(ind.shape[0]):
+            if ind[i] > -1:
+                ind[i] += offset
+
+    return kernel
+
+
+def _offset_indices(ind, offset):
+    # Add an offset to all of the valid indices in place.  Indices of -1 have
+    # a special meaning and must be left untouched.
+    kernel = _offset_indices_kernel()
+    if kernel is not None:
+        kernel(ind, offset)
+    else:
+        np.add(ind, offset, where=ind > -1, out=ind)
+
+
+@functools.lru_cache(maxsize=256)
+def _core_ngals(fname, mtime, snapshot):
+    # The number of galaxies written by each core for a snapshot.  These are
+    # needed to offset the progenitor and descendant indices and are usually
+    # asked for repeatedly, so we cache them.
+    with _open(fname) as fin:
+        snap_group = fin[_snap_name(snapshot)]
+        core_ngals = np.array(
+            [snap_group["Core%d" % i_core]["Galaxies"].size for i_core in range(fin.attrs["NCores"][0])],
+            dtype=np.int64,
+        )
+
+    core_ngals.flags.writeable = False
+    return core_ngals
+
+
+def _apply_offsets(G, dest_sel, counter):
+    # Deal with any indices that need offsets applied
+    try:
+        G[dest_sel]["CentralGal"] += counter
+    except ValueError:
+        pass
+
+
+def _gal_dtype(galaxies, props):
+    # The dtype of the requested properties of a galaxies dataset.  This is
+    # built from the dataset metadata alone (the field dtypes carry any
+    # subarray shapes) so that no galaxies need to be read just to work it out.
+    gal_dtype = galaxies.dtype
+    if props is not None:
+        missing = [p for p in props if p not in gal_dtype.names]
+        if missing:
+            raise ValueError("Unknown galaxy properties: %s" % ", ".join(missing))
+        gal_dtype = np.dtype([(p, gal_dtype.fields[p][0]) for p in props])
+    return gal_dtype
+
+
+def _to_native(G):
+    # Galaxies written on a machine of the other endianness are read in the
+    # file's byte order, which is HDF5's fast path, and only then swapped to
+    # native order here.  Swapping in numpy is far quicker than having HDF5
+    # convert them as they are read.
+    native = G.dtype.newbyteorder("=")
+    if native == G.dtype:
+        return G
+
+    fields = [G.dtype.fields[name][0].base for name in G.dtype.names]
+    if not any(f.isnative and f.itemsize > 1 for f in fields):
+        # everything needs swapping, so we can do it in place
+        return G.byteswap(inplace=True).view(native)
+
+    return G.astype(native)
+
+
+def _mpi_read_gals(snap_group, G, n_cores, comm):
+    """Read all of the galaxies in a snapshot into `G`, sharing the per-core
+    datasets between the ranks of `comm`.
+
+    Each rank reads a contiguous block of cores straight into its own slice of
+    `G` and the slices are then gathered so that every rank ends up with the
+    full array.
+    """
+
+    from mpi4py import MPI
+
+    core_ngals = np.array([snap_group["Core%d/Galaxies" % i_core].size for i_core in range(n_cores)], dtype=np.int64)
+    core_offsets = np.concatenate(([0], np.cumsum(core_ngals)))
+
+    rank_cores = np.array_split(np.arange(n_cores), comm.size)
+    rank_start = np.array([cores[0] if cores.size > 0 else n_cores for cores in rank_cores])
+    rank_stop = np.array([cores[-1] + 1 if cores.size > 0 else n_cores for cores in rank_cores])
+
+    for i_core in rank_cores[comm.rank]:
+        if core_ngals[i_core] > 0:
+            dest_sel = np.s_[core_offsets[i_core] : core_offsets[i_core + 1]]
+            _read_slab(snap_group["Core%d/Galaxies" % i_core], G, dest_sel=dest_sel)
+            _apply_offsets(G, dest_sel, core_offsets[i_core])
+
+    # Gather whole galaxies at a time so that the counts don't overflow for
+    # large snapshots
+    displs = core_offsets[rank_start]
+    counts = core_offsets[rank_stop] - displs
+    gal_type = MPI.BYTE.Create_contiguous(G.itemsize).Commit()
+    try:
+        comm.Allgatherv(MPI.IN_PLACE, [G.view(np.uint8), counts, displs, gal_type])
+    finally:
+        gal_type.Free()
+
+
 def read_gals(
-    fname, snapshot=None, props=None, sim_props=False, pandas=False, table=False, h=None, indices=None,
+    fname,
+    snapshot=None,
+    props=None,
+    sim_props=False,
+    pandas=False,
+    table=False,
+    h=None,
+    indices=None,
+    comm=None,
+    n_procs=1,
 ):
 
     """Read in a Meraxes hdf5 output file.
@@ -99,6 +644,23 @@ def read_gals(
         Indices of galaxies to be read.  If `None` then read all galaxies.
         (default = None)
 
+    comm : mpi4py.MPI.Comm
+        If provided (with more than one rank) then the per-core galaxy datasets
+        are shared between the ranks, read in parallel and gathered so that
+        every rank returns all of the galaxies.  All ranks of `comm` must call
+        this function together.  Only used when `indices` is `None`.
+        (default = None)
+
+    n_procs : int
+        Number of processes used to read the per-core galaxy datasets in
+        parallel.  Only used when `indices` is `None` and no `comm` is given.
+        The worker processes are spawned, so a script that passes `n_procs` >
+        1 must make its calls from under an ``if __name__ == "__main__":``
+        guard.  The returned array lives in shared memory (/dev/shm on
+        Linux) for as long as it is kept, so that must be large enough to
+        hold it; a small /dev/shm, such as Docker's 64 MiB default, can crash
+        the process with a SIGBUS.  (default = 1)
+
     Returns
     -------
         An ndarray with the requested galaxies and properties.
@@ -109,38 +671,35 @@ def read_gals(
     if (h is None) and (__meraxes_h is not None):
         h = __meraxes_h
 
-    def __apply_offsets(G, dest_sel, counter):
-        # Deal with any indices that need offsets applied
-        try:
-            G[dest_sel]["CentralGal"] += counter
-        except ValueError:
-            pass
-
     if pandas:
         _check_pandas()
 
     if pandas and table:
         logger.error("Both `pandas` and `table` specified.  Please choose one" " or the other.")
 
-    # Grab the units and hubble conversions information
-    units = read_units(fname)
+    # Grab the units and hubble conversions information (only needed for
+    # the Hubble scaling and the pandas/astropy outputs)
+    units = None
+    if (h is not None) or pandas or table:
+        units = read_units(fname)
 
     # Open the file for reading
-    fin = h5.File(fname, "r")
+    use_mpi = (comm is not None) and (comm.size > 1)
+    use_mpio = use_mpi and h5.get_config().mpi
+    if use_mpio:
+        fin = h5.File(fname, "r", driver="mpio", comm=comm, **_FILE_KWARGS)
+    else:
+        fin = _open(fname)
 
     # Set the snapshot correctly
     if snapshot is None:
         snapshot = -1
-    if snapshot < 0:
-        present_snaps = np.asarray(list(fin.keys()))
-        selection = np.array([(p.find("Snap") == 0) for p in present_snaps])
-        present_snaps = [int(p[4:]) for p in present_snaps[selection]]
-        snapshot = sorted(present_snaps)[snapshot]
+    snapshot = _resolve_snapshot(fin, snapshot)
 
     logger.info("Reading snapshot %d" % snapshot)
 
     # Select the group for the requested snapshot.
-    snap_group = fin["Snap%03d" % (snapshot)]
+    snap_group = fin[_snap_name(snapshot)]
 
     # How many cores have been used for this run?
     n_cores = fin.attrs["NCores"][0]
@@ -157,44 +716,54 @@ def read_gals(
         indices.sort()
         ngals = indices.shape[0]
 
-    # Set the galaxy data type
-    gal_dtype = None
-    for i_core in range(n_cores):
-        try:
-            if props is not None:
-                gal_dtype = snap_group["Core%d/Galaxies" % i_core][tuple(props)][0].dtype
-            else:
-                gal_dtype = snap_group["Core%d/Galaxies" % i_core].dtype
-        except IndexError:
-            pass
-        if gal_dtype is not None:
-            break
-
-    # Newer versions of numpy will return a dtype with no fields if we have
-    # only requested one property.  We need to reconstruct a named dtype for
-    # the direct read below.
-    if gal_dtype.names is None:
-        assert len(props) == 1
-        gal_dtype = snap_group["Core%d/Galaxies" % i_core].dtype[props]
+    # Set the galaxy data type from the first core's dataset, which is then
+    # kept for the first pass of the read loop below
+    if indices is None:
+        galaxies = snap_group["Core0/Galaxies"]
+    else:
+        galaxies = _open_strided(snap_group, "Core0/Galaxies")
+    gal_dtype = _gal_dtype(galaxies, props)
 
     # Create a dataset large enough to hold all of the requested galaxies
     G = np.empty(ngals, dtype=gal_dtype)
     logger.info("Allocated %.1f MB" % (G.itemsize * ngals / 1024.0 / 1024.0))
 
+    if ngals > 0 and use_mpi and indices is None:
+        _mpi_read_gals(snap_group, G, n_cores, comm)
+
     # Loop through each of the requested groups and read in the galaxies
-    if ngals > 0:
+    elif ngals > 0:
+        # If requested, read all of the cores in parallel up front
+        pooled = (n_procs > 1) and (indices is None)
+        if pooled:
+            ds_names = ["%s/Core%d/Galaxies" % (snap_group.name, i_core) for i_core in range(n_cores)]
+            core_sizes = np.array([galaxies.size] + [fin[ds_name].size for ds_name in ds_names[1:]])
+            galaxies = None
+            G = _pool_read_cores(fname, ds_names, core_sizes, G.shape, G.dtype, n_procs)
+
         counter = 0
         total_read = 0
         for i_core in range(n_cores):
-            galaxies = snap_group["Core%d/Galaxies" % i_core]
-            core_ngals = galaxies.size
+            if pooled:
+                # the galaxies have all been read, so only the sizes are needed
+                core_ngals = core_sizes[i_core]
+            else:
+                # Only hold one core's dataset (and its chunk cache) open at a
+                # time
+                if i_core > 0:
+                    if indices is None:
+                        galaxies = snap_group["Core%d/Galaxies" % i_core]
+                    else:
+                        galaxies = _open_strided(snap_group, "Core%d/Galaxies" % i_core)
+                core_ngals = galaxies.size
 
             if core_ngals > 0:
                 if indices is None:
                     dest_sel = np.s_[counter : core_ngals + counter]
-                    galaxies.read_direct(G, dest_sel=dest_sel)
+                    if not pooled:
+                        _read_slab(galaxies, G, dest_sel=dest_sel)
 
-                    __apply_offsets(G, dest_sel, counter)
+                    _apply_offsets(G, dest_sel, counter)
                     counter += core_ngals
 
                 else:
@@ -205,11 +774,9 @@ def read_gals(
 
                     if read_ind.shape[0] > 0:
                         dest_sel = np.s_[counter : read_ind.shape[0] + counter]
-                        bool_sel = np.zeros(core_ngals, "bool")
-                        bool_sel[read_ind] = True
-                        G[dest_sel] = galaxies[G.dtype.names][bool_sel]
+                        _read_rows(galaxies, G, read_ind, dest_sel)
 
-                        __apply_offsets(G, dest_sel, total_read)
+                        _apply_offsets(G, dest_sel, total_read)
                         counter += read_ind.shape[0]
 
                     total_read += core_ngals
@@ -217,6 +784,8 @@ def read_gals(
             if counter >= ngals:
                 break
 
+    G = _to_native(G)
+
     # Print some checking statistics
     logger.info("Read in %d galaxies." % len(G))
 
@@ -226,27 +795,33 @@ def read_gals(
         h_conv = units["HubbleConversions"]
         logger.info("Scaling galaxy properties to h = %.3f" % h)
         for p in gal_dtype.names:
-            try:
-                conversion = h_conv[p]
-            except KeyError:
+            conversion = h_conv.get(p)
+            if conversion is None:
                 logger.warn("Unrecognised galaxy property %s - assuming no " "scaling with Hubble const!" % p)
-            if conversion.lower() != "none":
+                continue
+            if conversion.casefold() != "none":
                 try:
-                    G[p] = eval(conversion, dict(v=G[p], h=h, log10=np.log10, __builtins__={}))
+                    v = G[p]
+                    converted = _h_conversion(conversion)(v, h)
+                    if converted is not v:
+                        G[p] = converted
                 except:
                     logger.error("Failed to parse conversion string `%s` for unit" " %s" % (conversion, p))
 
     # If requested convert the numpy array into a pandas dataframe
     if pandas:
         logger.info("Converting to pandas DataFrame...")
-        G = ndarray_to_dataframe(G)
-        regex = re.compile("_\d*$")
-        # attach the units to each column
-        for k in G.columns:
-            try:
-                G[k].unit = units[re.sub(regex, "", k, 1)]
-            except KeyError:
+        # G is ours alone, so there is no need to copy it
+        G = ndarray_to_dataframe(G, copy=False)
+        # attach the units to each column, stripping the `_<i>` suffix from
+        # the columns of N(>1) dimensional properties
+        base_names = {k: k.rpartition("_") for k in G.columns}
+        for k, (base, sep, suffix) in base_names.items():
+            unit = units.get(base if sep and (suffix.isdigit() or not suffix) else k)
+            if unit is None:
                 logger.warn("Unrecognised galaxy property %s - assuming " "dimensionless quantitiy!" % k)
+            else:
+                G[k].unit = unit
     # else convert to astropy table and attach units
     elif table:
         logger.info("Converting to astropy Table...")
@@ -260,7 +835,7 @@ def read_gals(
     # Set some run properties
     if sim_props:
         properties = read_input_params(fname, h=h)
-        properties["Redshift"] = snap_group.attrs["Redshift"]
+        properties["Redshift"] = float(_read_attr(snap_group.id, b"Redshift")[0])
 
     fin.close()
 
@@ -270,6 +845,114 @@ def read_gals(
         return G
 
 
+def iter_gals(fname, snapshot=None, props=None, batch=1 << 20):
+    """Iterate over the galaxies of a Meraxes hdf5 output file in batches.
+
+    Only one batch of galaxies is held in memory at a time, which is useful for
+    reductions (sums, histograms etc.) over snapshots too large to read in
+    whole.
+
+    Parameters
+    ----------
+    fname : str
+        Full path to input hdf5 master file.
+
+    snapshot : int
+        The snapshot to read in.  (default: last present snapshot - see
+        `read_gals`)
+
+    props : list
+        A list of galaxy properties requested.  (default: All properties)
+
+    batch : int
+        Maximum number of galaxies in each batch.  (default = 1<<20)
+
+    Yields
+    ------
+    An ndarray of up to `batch` galaxies, in the same order as `read_gals`
+    returns them.  The CentralGal indices refer to the snapshot as a whole.
+    The same buffer is reused for every batch, so take a copy of anything
+    needed beyond the next iteration.  No Hubble scaling is applied.  The file
+    is held open until the iterator is exhausted (or closed).
+    """
+
+    with _open(fname) as fin:
+        if snapshot is None:
+            snapshot = -1
+        snapshot = _resolve_snapshot(fin, snapshot)
+        snap_group = fin[_snap_name(snapshot)]
+        n_cores = fin.attrs["NCores"][0]
+
+        buf = np.empty(batch, dtype=_gal_dtype(snap_group["Core0/Galaxies"], props))
+
+        counter = 0
+        for i_core in range(n_cores):
+            galaxies = snap_group["Core%d/Galaxies" % i_core]
+            core_ngals = galaxies.size
+            for start in range(0, core_ngals, batch):
+                n = min(batch, core_ngals - start)
+                _read_slab(galaxies, buf, source_sel=np.s_[start : start + n], dest_sel=np.s_[:n])
+                _apply_offsets(buf, np.s_[:n], counter)
+                yield _to_native(buf[:n])
+            counter += core_ngals
+
+
+def read_gals_many(fnames, snapshot=None, props=None, h=None, n_procs=1):
+    """Read in and concatenate the galaxies of several Meraxes hdf5 output
+    files.
+
+    Parameters
+    ----------
+    fnames : list
+        Full paths to the input hdf5 master files.
+
+    snapshot : int
+        The snapshot to read in.  (default: last present snapshot - see
+        `read_gals`)
+
+    props : list
+        A list of galaxy properties requested.  (default: All properties)
+
+    h : float
+        Hubble constant (/100) to scale the galaxy properties to.  If
+        `None` then no scaling is made unless `set_little_h` was previously
+        called.  (default = None)
+
+    n_procs : int
+        Number of processes used to read the files in parallel.
+        The worker processes are spawned, so a script that passes `n_procs` >
+        1 must make its calls from under an ``if __name__ == "__main__":``
+        guard.  (default = 1)
+
+    Returns
+    -------
+    An ndarray with the requested galaxies of every file, in the order of
+    `fnames`.  The CentralGal indices are offset so that they index into this
+    combined array.
+    """
+
+    # The workers won't know about any value set by `set_little_h`
+    if (h is None) and (__meraxes_h is not None):
+        h = __meraxes_h
+
+    read = functools.partial(read_gals, snapshot=snapshot, props=props, h=h)
+
+    if (n_procs > 1) and (len(fnames) > 1):
+        # HDF5 isn't fork safe, so the workers have to be spawned
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(n_procs, len(fnames)), mp_context=context) as pool:
+            parts = list(pool.map(read, fnames))
+    else:
+        parts = [read(fname) for fname in fnames]
+
+    counter = 0
+    for part in parts:
+        _apply_offsets(part, np.s_[:], counter)
+        counter += part.shape[0]
+
+    return np.concatenate(parts)
+
+
 def read_input_params(fname, h=None, raw=False):
     """ Read in the input parameters from a Meraxes hdf5 output file.
 
@@ -295,37 +978,13 @@ def read_input_params(fname, h=None, raw=False):
     if (h is None) and (__meraxes_h is not None):
         h = __meraxes_h
 
-    def arr_to_value(d):
-        for k, v in list(d.items()):
-            if isinstance(v, np.bytes_):
-                d[k] = str(v.astype(np.str_))
-            elif v.size == 1:
-                try:
-                    d[k] = v[0]
-                except IndexError:
-                    d[k] = v
-
-    def visitfunc(name, obj):
-        if isinstance(obj, h5.Group):
-            props_dict[name] = dict(list(obj.attrs.items()))
-            arr_to_value(props_dict[name])
-
-    logger.info("Reading input params...")
-
-    # Open the file for reading
-    fin = h5.File(fname, "r")
-
-    group = fin["InputParams"]
-
-    props_dict = dict(list(group.attrs.items()))
-    arr_to_value(props_dict)
-    group.visititems(visitfunc)
+    props_dict = copy.deepcopy(_read_input_params(*_file_key(fname)))
 
     # Update some properties
     if h is not None:
         logger.info("Scaling params to h = %.3f" % h)
-        props_dict["BoxSize"] = group.attrs["BoxSize"][0] / h
-        props_dict["PartMass"] = group.attrs["PartMass"][0] / h
+        props_dict["BoxSize"] = props_dict["BoxSize"] / h
+        props_dict["PartMass"] = props_dict["PartMass"] / h
 
     # Add extra props
     if not raw:
@@ -334,11 +993,19 @@ def read_input_params(fname, h=None, raw=False):
         info = read_git_info(fname)
         props_dict.update({"model_git_ref": info[0], "model_git_diff": info[1]})
 
-    fin.close()
-
     return props_dict
 
 
+@functools.lru_cache(maxsize=32)
+def _read_input_params(fname, mtime):
+    logger.info("Reading input params...")
+
+    # Read every attribute of the InputParams group (and its subgroups) in a
+    # single low level pass
+    with _open(fname) as fin:
+        return _read_group_attrs(h5.h5g.open(fin.id, b"InputParams"))
+
+
 def read_units(fname):
     """ Read in the units and hubble conversion information from a Meraxes hdf5
     output file.
@@ -355,55 +1022,89 @@ def read_units(fname):
         `HubbleConversions`).
     """
 
-    def arr_to_value(d):
-        for k, v in d.items():
-            if type(v) is np.ndarray and v.size == 1:
-                d[k] = v[0]
+    return copy.deepcopy(_read_units(*_file_key(fname)))
+
+
+def _read_attrs(oid):
+    # Read all of the attributes of a low level object into a dict, unpacking
+    # single values and decoding byte strings as we go.
+    attrs = {}
+
+    def read(name):
+        value = _read_attr(oid, name)
+        if isinstance(value, h5.Empty):
+            pass
+        elif value.size == 1:
+            value = value.item()
+            if isinstance(value, bytes):
+                value = value.decode("ascii")
+        elif value.dtype.kind == "O":
+            # variable length strings come back as bytes, whereas h5py's
+            # AttributeManager would give str
+            string_info = h5.check_string_dtype(value.dtype)
+            if string_info is not None:
+                decoded = [v.decode(string_info.encoding) for v in value.flat]
+                value = np.array(decoded, dtype=object).reshape(value.shape)
+        attrs[name.decode()] = value
+
+    h5.h5a.iterate(oid, read)
+    return attrs
+
 
-    def visitunits(name, obj):
-        if isinstance(obj, h5.Group):
-            units_dict[name] = dict(list(obj.attrs.items()))
-            arr_to_value(units_dict[name])
+def _read_group_attrs(gid):
+    # The attributes of a group, plus those of every group below it keyed by
+    # their relative path.
+    attrs = _read_attrs(gid)
 
-    def visitconv(name, obj):
-        if isinstance(obj, h5.Group):
-            hubble_conv_dict[name] = dict(list(obj.attrs.items()))
-            arr_to_value(hubble_conv_dict[name])
+    names = []
+    gid.links.visit(names.append)
+    for name in names:
+        oid = h5.h5o.open(gid, name)
+        if isinstance(oid, h5.h5g.GroupID):
+            attrs[name.decode()] = _read_attrs(oid)
+
+    return attrs
+
+
+def _units_walk(fid):
+    """Read the units and Hubble conversions of an open Meraxes file.
+
+    The groups and attributes are traversed with the low level API rather than
+    building h5py Group and AttributeManager objects for each of them.
+
+    Returns
+    -------
+    units : dict
+        Units of each property
+
+    hubble_conversions : dict
+        Sanitized Hubble conversion strings of each property
+    """
 
     def sanitize_dict_strings(d):
-        regex = re.compile("(\D\.\S*)|(__.*__)|(__)")
         for k, v in d.items():
             if type(v) is dict:
                 sanitize_dict_strings(v)
             else:
-                v = v.decode("ascii")
-                d[k] = re.sub(regex, "", v)
+                d[k] = _H_CONV_SANITIZE_RE.sub("", v)
+
+    units_dict = _read_group_attrs(h5.h5g.open(fid, b"Units"))
+    hubble_conv_dict = _read_group_attrs(h5.h5g.open(fid, b"HubbleConversions"))
+    sanitize_dict_strings(hubble_conv_dict)
 
+    return units_dict, hubble_conv_dict
+
+
+@functools.lru_cache(maxsize=32)
+def _read_units(fname, mtime):
     logger.info("Reading units...")
 
-    # Open the file for reading
-    fin = h5.File(fname, "r")
-
-    # Read the units
-    for name in ["Units", "HubbleConversions"]:
-        group = fin[name]
-        if name == "Units":
-            units_dict = dict(list(group.attrs.items()))
-            arr_to_value(units_dict)
-            group.visititems(visitunits)
-        if name == "HubbleConversions":
-            hubble_conv_dict = dict(list(group.attrs.items()))
-            arr_to_value(hubble_conv_dict)
-            group.visititems(visitconv)
-
-    # Sanitize the hubble conversions
-    sanitize_dict_strings(hubble_conv_dict)
+    with _open(fname) as fin:
+        units_dict, hubble_conv_dict = _units_walk(fin.id)
 
     # Put the hubble conversions information inside the units dict for ease
     units_dict["HubbleConversions"] = hubble_conv_dict
 
-    fin.close()
-
     return units_dict
 
 
@@ -424,11 +1125,13 @@ def read_git_info(fname):
         git diff of the model
     """
 
-    with h5.File(fname, "r") as fin:
-        gitdiff = fin["gitdiff"][()]
-        gitref = fin["gitdiff"].attrs["gitref"].copy()
+    with _open(fname) as fin:
+        ds = fin["gitdiff"]
+        gitdiff = ds[()]
+        gitref = ds.attrs["gitref"]
 
-    return gitref, gitdiff
+    # Hand back plain strings rather than numpy bytes scalars
+    return tuple(v.decode() if isinstance(v, bytes) else v for v in (gitref, gitdiff))
 
 
 def read_snaplist(fname, h=None):
@@ -460,25 +1163,30 @@ def read_snaplist(fname, h=None):
     if (h is None) and (__meraxes_h is not None):
         h = __meraxes_h
 
-    zlist = []
-    snaplist = []
-    lt_times = []
-
-    with h5.File(fname, "r") as fin:
-        for snap in list(fin.keys()):
-            try:
-                zlist.append(fin[snap].attrs["Redshift"][0])
-                snaplist.append(int(snap[-3:]))
-                lt_times.append(fin[snap].attrs["LTTime"][0])
-            except KeyError:
-                pass
+    with _open(fname) as fin:
+        # Allocate for every top level object and trim once we know how many
+        # of them are snapshots
+        n_objs = len(fin)
+        snaplist = np.empty(n_objs, dtype=int)
+        zlist = np.empty(n_objs, dtype=float)
+        lt_times = np.empty(n_objs, dtype=float)
+
+        n_snaps = 0
+        for snap, gid in _snapshot_groups(fin):
+            snaplist[n_snaps] = snap
+            _read_attr(gid, b"Redshift", zlist[n_snaps : n_snaps + 1])
+            _read_attr(gid, b"LTTime", lt_times[n_snaps : n_snaps + 1])
+            n_snaps += 1
+
+    snaplist = snaplist[:n_snaps]
+    zlist = zlist[:n_snaps]
+    lt_times = lt_times[:n_snaps]
 
-    lt_times = np.array(lt_times, dtype=float)
     if h is not None:
         logger.info("Scaling lt_times to h = %.3f" % h)
         lt_times /= h
 
-    return np.array(snaplist, dtype=int), np.array(zlist, dtype=float), lt_times
+    return snaplist, zlist, lt_times
 
 
 def check_for_redshift(fname, redshift, tol=0.1):
@@ -545,9 +1253,33 @@ def check_for_global_xH(fname, xH, tol=0.1):
         Closest corresponding redshift
     """
 
-    snaps, z, lt_times = read_snaplist(fname)
-    xH_list = read_global_xH(fname, snaps)
-    xH_list[np.isnan(xH_list)] = -999
+    # Grab the redshifts and global neutral fractions in a single pass over
+    # the snapshots
+    with _open(fname) as fin:
+        n_objs = len(fin)
+        snaps = np.empty(n_objs, dtype=int)
+        z = np.empty(n_objs, dtype=float)
+        xH_list = np.full(n_objs, -999.0)
+
+        n_snaps = 0
+        for snap, gid in _snapshot_groups(fin):
+            snaps[n_snaps] = snap
+            _read_attr(gid, b"Redshift", z[n_snaps : n_snaps + 1])
+
+            xH_id = h5.h5o.open(gid, b"Grids/xH") if b"Grids/xH" in gid else None
+            if xH_id is not None and h5.h5a.exists(xH_id, b"volume_weighted_global_xH"):
+                _read_attr(xH_id, b"volume_weighted_global_xH", xH_list[n_snaps : n_snaps + 1])
+            elif xH_id is not None and h5.h5a.exists(xH_id, b"global_xH"):
+                # This case deals with old style Meraxes file outputs
+                _read_attr(xH_id, b"global_xH", xH_list[n_snaps : n_snaps + 1])
+            else:
+                logger.warning("No global_xH found for snapshot %d in file %s" % (snap, fname))
+            n_snaps += 1
+
+    snaps = snaps[:n_snaps]
+    z = z[:n_snaps]
+    xH_list = xH_list[:n_snaps]
+
     delta_xH = xH - xH_list
 
     w = np.argmin(np.abs(delta_xH))
@@ -577,13 +1309,9 @@ def grab_redshift(fname, snapshot):
         Corresponding redshift value
     """
 
-    with h5.File(fname, "r") as fin:
-        if snapshot < 0:
-            present_snaps = np.asarray(list(fin.keys()))
-            selection = np.array([(p.find("Snap") == 0) for p in present_snaps])
-            present_snaps = [int(p[4:]) for p in present_snaps[selection]]
-            snapshot = sorted(present_snaps)[snapshot]
-        redshift = fin["Snap{:03d}".format(snapshot)].attrs["Redshift"][0]
+    with _open(fname) as fin:
+        snapshot = _resolve_snapshot(fin, snapshot)
+        redshift = _read_scalar_attr(fin, _snap_name(snapshot), "Redshift")
 
     return redshift
 
@@ -607,13 +1335,13 @@ def grab_unsampled_snapshot(fname, snapshot):
         Corresponding unsampled snapshot value
     """
 
-    with h5.File(fname, "r") as fin:
-        redshift = fin["Snap{:03d}".format(snapshot)].attrs["UnsampledSnapshot"][0]
+    with _open(fname) as fin:
+        redshift = _read_scalar_attr(fin, _snap_name(snapshot), "UnsampledSnapshot")
 
     return redshift
 
 
-def read_firstprogenitor_indices(fname, snapshot, pandas=False):
+def read_firstprogenitor_indices(fname, snapshot, pandas=False, n_procs=1):
 
     """ Read the FirstProgenitor indices from the Meraxes HDF5 file.
 
@@ -628,6 +1356,15 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
     pandas : bool
         Return a pandas series instead of a numpy array.  (default = False)
 
+    n_procs : int
+        Number of processes used to read the per-core datasets in parallel.
+        The worker processes are spawned, so a script that passes `n_procs` >
+        1 must make its calls from under an ``if __name__ == "__main__":``
+        guard.  The returned array lives in shared memory (/dev/shm on
+        Linux) for as long as it is kept, so that must be large enough to
+        hold it; a small /dev/shm, such as Docker's 64 MiB default, can crash
+        the process with a SIGBUS.  (default = 1)
+
 
     Returns
     -------
@@ -638,30 +1375,31 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
 
         # group in the master file for this snapshot
-        snap_group = fin["Snap{:03d}".format(snapshot)]
-
-        # group for the previous snapshot
-        prev_snap_group = fin["Snap{:03d}".format(snapshot - 1)]
+        snap_group = fin[_snap_name(snapshot)]
 
         # number of galaxies in this snapshot
         n_gals = snap_group.attrs["NGalaxies"][0]
 
-        # malloc the fp_ind array and an array that will hold offsets for
-        # each core
+        # malloc the fp_ind array
         fp_ind = np.zeros(n_gals, "i4")
-        prev_core_counter = np.zeros(n_cores, "i4")
 
         # calculate the offsets for each core
-        prev_core_counter[0] = 0
-        for i_core in range(n_cores - 1):
-            prev_core_counter[i_core + 1] = prev_snap_group["Core{:d}/Galaxies".format(i_core)].size
-        prev_core_counter = np.cumsum(prev_core_counter)
+        prev_core_counter = np.concatenate(([0], np.cumsum(_core_ngals(*_file_key(fname), snapshot - 1)[:-1])))
+
+        # if requested, read all of the cores in parallel up front
+        pooled = n_procs > 1
+        if pooled:
+            ds_names = [
+                "{:s}/Core{:d}/FirstProgenitorIndices".format(snap_group.name, i_core) for i_core in range(n_cores)
+            ]
+            core_nvals = np.array([fin[ds_name].size for ds_name in ds_names])
+            fp_ind = _pool_read_cores(fname, ds_names, core_nvals, fp_ind.shape, fp_ind.dtype, n_procs)
 
         # loop through and read in the FirstProgenitorIndices for each core. Be
         # sure to update the value to reflect that we are making one big array
@@ -669,13 +1407,15 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
         # that = -1.  This has special meaning!
         counter = 0
         for i_core in range(n_cores):
-            ds = snap_group["Core{:d}/FirstProgenitorIndices".format(i_core)]
+            core_group = snap_group["Core{:d}".format(i_core)]
+            ds = core_group["FirstProgenitorIndices"]
             core_nvals = ds.size
             if core_nvals > 0:
                 dest_sel = np.s_[counter : core_nvals + counter]
-                ds.read_direct(fp_ind, dest_sel=dest_sel)
+                if not pooled:
+                    ds.read_direct(fp_ind, dest_sel=dest_sel)
                 counter += core_nvals
-                fp_ind[dest_sel][fp_ind[dest_sel] > -1] += prev_core_counter[i_core]
+                _offset_indices(fp_ind[dest_sel], prev_core_counter[i_core])
 
     if pandas:
         fp_ind = pd.Series(fp_ind)
@@ -683,7 +1423,7 @@ def read_firstprogenitor_indices(fname, snapshot, pandas=False):
     return fp_ind
 
 
-def read_nextprogenitor_indices(fname, snapshot, pandas=False):
+def read_nextprogenitor_indices(fname, snapshot, pandas=False, n_procs=1):
 
     """ Read the NextProgenitor indices from the Meraxes HDF5 file.
 
@@ -698,6 +1438,15 @@ def read_nextprogenitor_indices(fname, snapshot, pandas=False):
     pandas : bool
         Return a pandas series instead of a numpy array.  (default = False)
 
+    n_procs : int
+        Number of processes used to read the per-core datasets in parallel.
+        The worker processes are spawned, so a script that passes `n_procs` >
+        1 must make its calls from under an ``if __name__ == "__main__":``
+        guard.  The returned array lives in shared memory (/dev/shm on
+        Linux) for as long as it is kept, so that must be large enough to
+        hold it; a small /dev/shm, such as Docker's 64 MiB default, can crash
+        the process with a SIGBUS.  (default = 1)
+
     Returns
     -------
     np_ind : array
@@ -707,13 +1456,13 @@ def read_nextprogenitor_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
 
         # group in the master file for this snapshot
-        snap_group = fin["Snap{:03d}".format(snapshot)]
+        snap_group = fin[_snap_name(snapshot)]
 
         # number of galaxies in this snapshot
         n_gals = snap_group.attrs["NGalaxies"][0]
@@ -721,18 +1470,29 @@ def read_nextprogenitor_indices(fname, snapshot, pandas=False):
         # malloc the np_ind array
         np_ind = np.zeros(n_gals, "i4")
 
+        # if requested, read all of the cores in parallel up front
+        pooled = n_procs > 1
+        if pooled:
+            ds_names = [
+                "{:s}/Core{:d}/NextProgenitorIndices".format(snap_group.name, i_core) for i_core in range(n_cores)
+            ]
+            core_nvals = np.array([fin[ds_name].size for ds_name in ds_names])
+            np_ind = _pool_read_cores(fname, ds_names, core_nvals, np_ind.shape, np_ind.dtype, n_procs)
+
         # loop through and read in the NextProgenitorIndices for each core. Be
         # sure to update the value to reflect that we are making one big array
         # from the output of all cores. Also be sure *not* to update np indices
         # that = -1.  This has special meaning!
         counter = 0
         for i_core in range(n_cores):
-            ds = snap_group["Core{:d}/NextProgenitorIndices".format(i_core)]
+            core_group = snap_group["Core{:d}".format(i_core)]
+            ds = core_group["NextProgenitorIndices"]
             core_nvals = ds.size
             if core_nvals > 0:
                 dest_sel = np.s_[counter : core_nvals + counter]
-                ds.read_direct(np_ind, dest_sel=dest_sel)
-                np_ind[dest_sel][np_ind[dest_sel] > -1] += counter
+                if not pooled:
+                    ds.read_direct(np_ind, dest_sel=dest_sel)
+                _offset_indices(np_ind[dest_sel], counter)
                 counter += core_nvals
 
     if pandas:
@@ -741,7 +1501,69 @@ def read_nextprogenitor_indices(fname, snapshot, pandas=False):
     return np_ind
 
 
-def read_descendant_indices(fname, snapshot, pandas=False):
+def read_progenitors(fname, snapshots, kind="First"):
+
+    """ Read the FirstProgenitor or NextProgenitor indices of a number of
+    snapshots from the Meraxes HDF5 file.
+
+    This is equivalent to calling `read_firstprogenitor_indices` or
+    `read_nextprogenitor_indices` for each snapshot in turn, but the file is
+    only opened once and each per-core dataset is read with a single low level
+    call.
+
+    Parameters
+    ----------
+    fname : str
+        Full path to input hdf5 master file
+
+    snapshots : list
+        Snapshots from which the progenitors datasets are to be read.
+
+    kind : str
+        'First' -> FirstProgenitor indices
+        'Next' -> NextProgenitor indices
+        (default = 'First')
+
+    Returns
+    -------
+    ind : list
+        Progenitor index array for each of the requested snapshots
+    """
+
+    if kind not in ("First", "Next"):
+        raise ValueError("Unrecognized progenitor kind: %s" % kind)
+
+    with _open(fname) as fin:
+        n_cores = fin.attrs["NCores"][0]
+        ds_name = "Core{:d}/%sProgenitorIndices" % kind
+        key = _file_key(fname)
+
+        inds = []
+        for snapshot in snapshots:
+            snap_group = fin[_snap_name(snapshot)]
+            ind = np.zeros(snap_group.attrs["NGalaxies"][0], "i4")
+
+            # FirstProgenitor indices point into the previous snapshot, whereas
+            # NextProgenitor indices point into this one
+            offset_snap = snapshot - 1 if kind == "First" else snapshot
+            prev_core_counter = np.concatenate(([0], np.cumsum(_core_ngals(*key, offset_snap)[:-1])))
+
+            counter = 0
+            for i_core in range(n_cores):
+                dsid = snap_group[ds_name.format(i_core)].id
+                core_nvals = dsid.shape[0]
+                if core_nvals > 0:
+                    dest = ind[counter : core_nvals + counter]
+                    dsid.read(h5.h5s.ALL, h5.h5s.ALL, dest)
+                    _offset_indices(dest, prev_core_counter[i_core])
+                    counter += core_nvals
+
+            inds.append(ind)
+
+    return inds
+
+
+def read_descendant_indices(fname, snapshot, pandas=False, n_procs=1):
 
     """ Read the Descendant indices from the Meraxes HDF5 file.
 
@@ -756,6 +1578,15 @@ def read_descendant_indices(fname, snapshot, pandas=False):
     pandas : bool
         Return a pandas series instead of a numpy array.  (default = False)
 
+    n_procs : int
+        Number of processes used to read the per-core datasets in parallel.
+        The worker processes are spawned, so a script that passes `n_procs` >
+        1 must make its calls from under an ``if __name__ == "__main__":``
+        guard.  The returned array lives in shared memory (/dev/shm on
+        Linux) for as long as it is kept, so that must be large enough to
+        hold it; a small /dev/shm, such as Docker's 64 MiB default, can crash
+        the process with a SIGBUS.  (default = 1)
+
     Returns
     -------
     desc_ind : array
@@ -765,30 +1596,31 @@ def read_descendant_indices(fname, snapshot, pandas=False):
     if pandas:
         _check_pandas()
 
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
 
         # number of cores used for this run
         n_cores = fin.attrs["NCores"][0]
 
         # group in the master file for this snapshot
-        snap_group = fin["Snap{:03d}".format(snapshot)]
-
-        # group for the next snapshot
-        next_snap_group = fin["Snap{:03d}".format(snapshot + 1)]
+        snap_group = fin[_snap_name(snapshot)]
 
         # number of galaxies in this snapshot
         n_gals = snap_group.attrs["NGalaxies"][0]
 
-        # malloc the desc_ind array and an array that will hold offsets for
-        # each core
+        # malloc the desc_ind array
         desc_ind = np.zeros(n_gals, "i4")
-        prev_core_counter = np.zeros(n_cores, "i4")
 
         # calculate the offsets for each core
-        prev_core_counter[0] = 0
-        for i_core in range(n_cores - 1):
-            prev_core_counter[i_core + 1] = next_snap_group["Core{:d}/Galaxies".format(i_core)].size
-        prev_core_counter = np.cumsum(prev_core_counter)
+        prev_core_counter = np.concatenate(([0], np.cumsum(_core_ngals(*_file_key(fname), snapshot + 1)[:-1])))
+
+        # if requested, read all of the cores in parallel up front
+        pooled = n_procs > 1
+        if pooled:
+            ds_names = [
+                "{:s}/Core{:d}/DescendantIndices".format(snap_group.name, i_core) for i_core in range(n_cores)
+            ]
+            core_nvals = np.array([fin[ds_name].size for ds_name in ds_names])
+            desc_ind = _pool_read_cores(fname, ds_names, core_nvals, desc_ind.shape, desc_ind.dtype, n_procs)
 
         # loop through and read in the DescendantIndices for each core. Be sure
         # to update the value to reflect that we are making one big array from
@@ -796,13 +1628,15 @@ def read_descendant_indices(fname, snapshot, pandas=False):
         # that = -1.  This has special meaning!
         counter = 0
         for i_core in range(n_cores):
-            ds = snap_group["Core{:d}/DescendantIndices".format(i_core)]
+            core_group = snap_group["Core{:d}".format(i_core)]
+            ds = core_group["DescendantIndices"]
             core_nvals = ds.size
             if core_nvals > 0:
                 dest_sel = np.s_[counter : core_nvals + counter]
-                ds.read_direct(desc_ind, dest_sel=dest_sel)
+                if not pooled:
+                    ds.read_direct(desc_ind, dest_sel=dest_sel)
                 counter += core_nvals
-                desc_ind[dest_sel][desc_ind[dest_sel] > -1] += prev_core_counter[i_core]
+                _offset_indices(desc_ind[dest_sel], prev_core_counter[i_core])
 
     if pandas:
         desc_ind = pd.Series(desc_ind)
@@ -852,20 +1686,28 @@ def read_grid(spec, fname, snapshot, name, h=None, h_scaling={}):
     if (spec != 0) and (spec != 1):
         raise ValueError("spec should be either 0 (reio) or 1 (metal)")    
         
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
         if spec == 0:
             try:
                 grid_dim = fin["InputParams"].attrs["ReionGridDim"][0]
             except KeyError:
                 grid_dim = fin["InputParams"].attrs["TOCF_HII_dim"][0]
-            ds_name = "Snap{:03d}/Grids/{:s}".format(snapshot, name)
+            ds_name = "{:s}/Grids/{:s}".format(_snap_name(snapshot), name)
         elif spec == 1:
             grid_dim = fin["InputParams"].attrs["MetalGridDim"][0]
-            ds_name = "Snap{:03d}/MetalGrids/{:s}".format(snapshot, name)
+            ds_name = "{:s}/MetalGrids/{:s}".format(_snap_name(snapshot), name)
         try:
-            grid = fin[ds_name][:]
+            ds = fin[ds_name]
         except KeyError:
             logger.error("No grid called %s found in file %s ." % (name, fname))
+        else:
+            # Read straight into the final cube, whatever shape the grid is
+            # stored with on disk
+            grid = np.empty([grid_dim,] * 3, dtype=ds.dtype)
+            if _can_read_direct_chunks(ds, grid, allow_unallocated=True):
+                _read_direct_chunks(ds, grid.reshape(ds.shape))
+            else:
+                ds.read_direct(grid.reshape(ds.shape))
 
     # Apply any Hubble scalings
     if h is not None:
@@ -882,12 +1724,10 @@ def read_grid(spec, fname, snapshot, name, h=None, h_scaling={}):
 
         if conversion.lower() != "none":
             try:
-                grid = eval(conversion, dict(v=grid, h=h, log10=np.log10, __builtins__={}))
+                grid = _h_conversion(conversion)(grid, h)
             except:
                 logger.error("Failed to parse conversion string `%s` for unit" " %s" % (conversion, name))
 
-    grid.shape = [grid_dim,] * 3
-
     return grid
 
 
@@ -916,11 +1756,11 @@ def list_grids(spec, fname, snapshot):
     if (spec != 0) and (spec != 1):
         raise Exception("spec should be either 0 (reio) or 1 (metal)") 
 
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
         if spec == 0:
-            group_name = "Snap{:03d}/Grids".format(snapshot)
+            group_name = _snap_name(snapshot) + "/Grids"
         elif spec == 1:
-            group_name = "Snap{:03d}/MetalGrids".format(snapshot)
+            group_name = _snap_name(snapshot) + "/MetalGrids"
         try:
             grids = list(k for k, v in fin[group_name].items() if len(v.shape) == 3)
         except KeyError:
@@ -954,10 +1794,11 @@ def read_ps(fname, snapshot):
         error
     """
 
-    with h5.File(fname, "r") as fp:
-        ps = fp[f"Snap{snapshot:03d}/Grids/PS_data"][:]
-        k = fp[f"Snap{snapshot:03d}/Grids/k_bins"][:]
-        pserr = fp[f"Snap{snapshot:03d}/Grids/PS_error"][:]
+    with _open(fname) as fp:
+        grids = fp[_snap_name(snapshot) + "/Grids"]
+        ps = grids["PS_data"][:]
+        k = grids["k_bins"][:]
+        pserr = grids["PS_error"][:]
 
     return k, ps, pserr
 
@@ -999,21 +1840,20 @@ def read_global_xH(fname, snapshot, weight="volume"):
     snapshot = np.array(snapshot)
     global_xH = np.zeros(snapshot.size)
 
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
         for ii, snap in enumerate(snapshot):
-            ds_name = "Snap{:03d}/Grids/xH".format(snap)
+            ds_name = _snap_name(snap) + "/Grids/xH"
             try:
-                global_xH[ii] = fin[ds_name].attrs[prop][0]
+                attrs = fin[ds_name].attrs
             except KeyError:
-                if weight == "volume":
-                    # This case deals with old style Meraxes file outputs
-                    try:
-                        global_xH[ii] = fin[ds_name].attrs["global_xH"][0]
-                    except KeyError:
-                        pass
-                    else:
-                        continue
+                attrs = {}
 
+            if prop in attrs:
+                global_xH[ii] = attrs[prop][0]
+            elif weight == "volume" and "global_xH" in attrs:
+                # This case deals with old style Meraxes file outputs
+                global_xH[ii] = attrs["global_xH"][0]
+            else:
                 global_xH[ii] = np.nan
                 logger.warning("No global_xH found for snapshot %d in file %s" % (snap, fname))
 
@@ -1053,7 +1893,7 @@ def read_global_J_21(fname, snapshot):
     # Older versions of the Meraxes output won't have the global J_21 attribute, so we will need to calculate it
     # ourselves in that case...
     global_val_exists = False
-    with h5.File(fname, "r") as fin:
+    with _open(fname) as fin:
         for k, v in fin.items():
             if (
                 k.startswith("Snap")
@@ -1064,32 +1904,37 @@ def read_global_J_21(fname, snapshot):
                 global_val_exists = True
                 break
 
-    if global_val_exists:
-        # The global value has been precalculated. Thanks goodness!
-        with h5.File(fname, "r") as fin:
+        if global_val_exists:
+            # The global value has been precalculated. Thanks goodness!
             for ii, snap in enumerate(snapshot):
-                ds_name = "Snap{:03d}/Grids/J_21".format(snap)
+                ds_name = _snap_name(snap) + "/Grids/J_21"
                 try:
                     global_J_21[ii] = fin[ds_name].attrs["volume_weighted_global_J_21"][0]
                 except KeyError:
                     global_J_21[ii] = np.nan
                     logger.warning("No global_J_21 found for snapshot %d in file %s" % (snap, fname))
-    else:
-        # The global value hasn't been precalculated. We'll need to calculate it ourselves from the grid. Since the grid
-        # may be large we will need to sort the values before summing to try and beat down as much floating point error
-        # as possible. This will be slow for large grids!
-        logger.warning(
-            "No volume_weighted_global_J_21 values found in Meraxes file. Calculating manually (this may "
-            "be slower than expected)..."
-        )
-        with h5.File(fname, "r") as fin:
+        else:
+            # The global value hasn't been precalculated. We'll need to calculate it ourselves from the grid. Since
+            # the grid may be large we will need to sort the values before summing to try and beat down as much
+            # floating point error as possible. This will be slow for large grids!
+            logger.warning(
+                "No volume_weighted_global_J_21 values found in Meraxes file. Calculating manually (this may "
+                "be slower than expected)..."
+            )
             for ii, snap in enumerate(snapshot):
-                ds_name = "Snap{:03d}/Grids/J_21".format(snap)
+                ds_name = _snap_name(snap) + "/Grids/J_21"
                 try:
-                    global_J_21[ii] = np.sort(fin[ds_name][:].astype(np.float64)).sum() / float(fin[ds_name].size)
+                    ds = fin[ds_name]
                 except KeyError:
                     global_J_21[ii] = np.nan
                     logger.warning("No J_21 grid found for snapshot %d in file %s" % (snap, fname))
+                else:
+                    # Let HDF5 convert to double precision as it reads, then sort
+                    # in place
+                    grid = np.empty(ds.size, dtype=np.float64)
+                    ds.read_direct(grid.reshape(ds.shape))
+                    grid.sort()
+                    global_J_21[ii] = grid.sum() / float(ds.size)
 
     if snapshot.size == 1:
         return global_J_21[0]
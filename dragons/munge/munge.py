@@ -39,11 +39,51 @@ def pretty_print_dict(d, fmtlen=30):
             print(fmtstr % k, v)
 
 
-def ndarray_to_dataframe(arr, drop_vectors=False):
+def _flat_columns(arr, drop_vectors):
+    # If every field of `arr` shares one base dtype and they are packed
+    # back-to-back in the same order as the DataFrame's columns, then `arr` can
+    # be viewed as a 2D array of that dtype.  Return the dtype and the column
+    # names if so.
+    if arr.ndim != 1 or not arr.flags.c_contiguous:
+        return None
+
+    columns = []
+    offset = 0
+    seen_vector = False
+    base = None
+    for k in arr.dtype.names:
+        dtype, field_offset = arr.dtype.fields[k][:2]
+        if base is None:
+            base = dtype.base
+        if dtype.base != base or field_offset != offset or len(dtype.shape) > 1:
+            return None
+        if len(dtype.shape) == 0:
+            # the scalar columns must all come before any vector ones
+            if seen_vector:
+                return None
+            columns.append(k)
+        else:
+            if drop_vectors:
+                return None
+            seen_vector = True
+            columns.extend(k + "_%d" % i for i in range(dtype.shape[0]))
+        offset += dtype.itemsize
+
+    if offset != arr.dtype.itemsize:
+        return None
+
+    return base, columns
+
+
+def ndarray_to_dataframe(arr, drop_vectors=False, copy=True):
 
     """Convert numpy ndarray to a pandas DataFrame, dealing with N(>1)
     dimensional datatypes.
 
+    If all of the fields share a single dtype and are tightly packed then the
+    DataFrame is built from a 2D view of `arr`, which avoids a copy when
+    `copy` is False.
+
     Parameters
     ----------
     arr : ndarray
@@ -52,30 +92,37 @@ def ndarray_to_dataframe(arr, drop_vectors=False):
     drop_vectors : bool
         only include single value datatypes in output DataFrame
 
+    copy : bool
+        If False, allow the DataFrame to share memory with `arr` where
+        possible, in which case changes to one will show up in the other.
+        (default = True)
+
     Returns
     -------
     df : DataFrame
         Pandas DataFrame
     """
 
-    # Get a list of all of the columns which are 1D
-    names = []
-    for k, v in arr.dtype.fields.items():
-        if len(v[0].shape) == 0:
-            names.append(k)
+    flat = _flat_columns(arr, drop_vectors)
+    if flat is not None:
+        base, columns = flat
+        return DataFrame(arr.view(base).reshape(arr.shape[0], len(columns)), columns=columns, copy=copy)
 
-    # Create a new dataframe with these columns
-    df = DataFrame(arr[names])
+    # Collect all of the columns first so that the dataframe is built in one
+    # go, rather than appending (and copying) one column at a time.  The 1D
+    # columns come first...
+    columns = {k: arr[k] for k, v in arr.dtype.fields.items() if len(v[0].shape) == 0}
 
     if not drop_vectors:
-        # Loop through each N(>1)D property and append each dimension as
-        # its own column in the dataframe
+        # ...followed by each dimension of the N(>1)D properties as its own
+        # column
         for k, v in arr.dtype.fields.items():
             if len(v[0].shape) == 1:
+                vec = arr[k]
                 for i in range(v[0].shape[0]):
-                    df[k + "_%d" % i] = arr[k][:, i]
+                    columns[k + "_%d" % i] = vec[:, i]
 
-    return df
+    return DataFrame(columns)
 
 
 def mass_function(mass, volume, bins, range=None, poisson_uncert=False, return_edges=False, **kwargs):